@@ -2,7 +2,6 @@ import pandas as pd
 import seaborn as sns
 import matplotlib.pyplot as plt
 import matplotlib.colors as mcolors
-from operator import attrgetter
 from ..data import utils
 sns.set()
 
@@ -32,7 +31,11 @@ def main(df_members, freq='Q', export_plot=True):
         return
 
     # remove supercoop company account
-    df_members = df_members.loc[df_members.member_ID != 46]
+    # (reuses the mask cached by features.main, falls back for older csv
+    # exports; .get() would evaluate the fallback comparison eagerly)
+    df_members = df_members.loc[df_members['is_real_member']
+                                if 'is_real_member' in df_members.columns
+                                else df_members.member_ID != 46]
 
     retention_matrix, cohort_pivot = make_retention_matrix(df_members, freq)
 
@@ -66,31 +69,32 @@ def make_retention_matrix(df_members, freq):
     cols = ['member_ID', 'delivery_date']
     members_cohort = df_members[cols].copy()
 
-    # add column delivery_freq to dataframe
+    # convert delivery_date to periods once,
+    # the cohort column below reuses the converted values
     members_cohort['delivery_freq'] = members_cohort['delivery_date'].dt.to_period(
         freq)
 
     # add cohort column (first_seen)
-    members_cohort['cohort'] = members_cohort.groupby('member_ID')['delivery_date'] \
-        .transform('min').dt.to_period(freq)
-    members_cohort.reset_index(inplace=True, drop=True)
+    members_cohort['cohort'] = members_cohort.groupby('member_ID')['delivery_freq'] \
+        .transform('min')
 
-    # aggregate cohort
-    members_cohort = members_cohort.groupby(['cohort', 'delivery_freq']) \
-        .agg(n_members=('member_ID', 'nunique')) \
-        .reset_index(drop=False)
+    # period_number as int64 ordinal subtraction,
+    # (delivery_freq - cohort).apply(attrgetter('n')) crossed into python per row
+    members_cohort['period_number'] = (members_cohort['delivery_freq'].array.asi8
+                                       - members_cohort['cohort'].array.asi8)
 
-    members_cohort['period_number'] = (members_cohort.delivery_freq
-                                       - members_cohort.cohort).apply(attrgetter('n'))
-
-    # create pivot table
-    cohort_pivot = members_cohort.pivot_table(index='cohort',
-                                              columns='period_number',
-                                              values='n_members')
+    # aggregate and pivot in one groupby pass,
+    # dedup once + size() counts in C instead of nunique's per-group hash sets
+    cohort_pivot = members_cohort[['cohort', 'period_number', 'member_ID']] \
+        .drop_duplicates() \
+        .groupby(['cohort', 'period_number']).size().unstack()
 
     # retention matrix
+    # divide as one numpy broadcast, .div(axis=0) dispatches per column
     cohort_size = cohort_pivot.iloc[:, 0]
-    retention_matrix = cohort_pivot.div(cohort_size, axis=0)
+    retention_matrix = pd.DataFrame(
+        cohort_pivot.to_numpy() / cohort_size.to_numpy()[:, None],
+        index=cohort_pivot.index, columns=cohort_pivot.columns)
 
     return retention_matrix, cohort_pivot
 
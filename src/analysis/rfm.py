@@ -1,5 +1,6 @@
 import pandas as pd
 import numpy as np
+import polars as pl
 import matplotlib.pyplot as plt
 import seaborn as sns
 from ..data import utils
@@ -71,39 +72,46 @@ def make_table(df_members, freq):
     '''
     # select columns of interest
     cols_of_interest = ['member_ID', 'delivery_date', 'order_request_value']
-    df = df_members[cols_of_interest].copy()
 
     # removing supercoop company account
-    df = df.loc[df.member_ID != 46]
+    # (reuses the mask cached by features.main, falls back for older csv
+    # exports; .get() would evaluate the fallback comparison eagerly)
+    mask = (df_members['is_real_member']
+            if 'is_real_member' in df_members.columns
+            else df_members.member_ID != 46)
+
+    # build the aggregation as a lazy polars pipeline,
+    # executed multi-threaded on collect()
+    lf = pl.from_pandas(df_members.loc[mask, cols_of_interest]).lazy()
 
     # create rfm table
-    period_end = df.delivery_date.max()  # TODO
-
-    # set delivery_date as index to convert into PeriodIndex of 'W'
-    # then cast back to DatetimeIndex of timestamps, at beginning of period.
-    rfm_table = df.set_index('delivery_date').to_period(
-        freq).to_timestamp().reset_index()
-
-    # sum all orders based on member_id and time (week)
-    rfm_table = rfm_table.groupby(['delivery_date', 'member_ID'],
-                                  sort=False, as_index=False).sum()
-
-    # get the most recent delivery_date, the frequencycount of deliverys and the mean order value
-    rfm_table = rfm_table.groupby('member_ID').agg({'delivery_date': 'max', 'member_ID': 'count',
-                                                    'order_request_value': 'mean'})
-    # rename all columns
-    rfm_table.rename(columns={'delivery_date': 'recency', 'member_ID': 'frequency',
-                              'order_request_value': 'monetary_value'}, inplace=True)
-
-    # calculating recency (with floor devision)
-    freq_timedeltas = {'W': np.timedelta64(1, 'W'), 'M': np.timedelta64(1, 'M'),
-                       'Q': np.timedelta64(3, 'M')}
-    rfm_table['recency'] = (period_end -
-                            rfm_table['recency']) // freq_timedeltas[freq]
+    period_end = lf.select(pl.col('delivery_date').max()).collect().item()  # TODO
+
+    # truncate delivery_date to the beginning of its period
+    # (same as the old to_period(freq).to_timestamp() roundtrip)
+    truncate_windows = {'W': '1w', 'M': '1mo', 'Q': '1q'}
+    lf = lf.with_columns(pl.col('delivery_date').dt.truncate(truncate_windows[freq]))
+
+    # sum all orders based on member_id and time (week),
+    # then get the most recent delivery_date,
+    # the frequencycount of deliverys and the mean order value
+    lf = lf.group_by(['delivery_date', 'member_ID']) \
+        .agg(pl.col('order_request_value').sum()) \
+        .group_by('member_ID') \
+        .agg([pl.col('delivery_date').max().alias('recency'),
+              pl.len().cast(pl.Int64).alias('frequency'),
+              pl.col('order_request_value').mean().alias('monetary_value')])
+
+    rfm_table = lf.collect().to_pandas().set_index('member_ID').sort_index()
+
+    # calculating recency as an int64 period-ordinal subtraction.
+    # exact for every freq, the old np.timedelta64 floor division
+    # approximated 'M' with 30.44 days
+    rfm_table['recency'] = (pd.Period(period_end, freq).ordinal
+                            - rfm_table['recency'].dt.to_period(freq).array.asi8)
 
     # set dataframe name
-    rfm_table.df_name = 'rfm_table'
-    rfm_table._metadata += ['df_name']
+    rfm_table.attrs['df_name'] = 'rfm_table'
 
     return rfm_table
 
@@ -130,26 +138,34 @@ def add_score(rfm_table, freq):
     # scale recency bin range beased on freq
     r_range = [0, 0.25, 0.5, 1, np.inf]
     freqs = {'W': 52, 'M': 12, 'Q': 4}
-    r_range = [x * freqs[freq] for x in r_range]
-
-    # use pd.cut to create and label bins
-    r_labels, r_bins = pd.cut(rfm_table.recency, bins=r_range, labels=[4, 3, 2, 1],
-                              retbins=True, include_lowest=True)
-    rfm_table['r_score'] = r_labels
-
-    # frequency
-    f_labels, f_bins = pd.qcut(rfm_table.frequency, 4,
-                               retbins=True, labels=range(1, 5))
-    rfm_table['f_score'] = f_labels
-
-    # monetary value
-    m_labels, m_bins = pd.qcut(rfm_table.monetary_value, 4,
-                               retbins=True, labels=range(1, 5))
-    rfm_table['m_score'] = m_labels
-
-    # combined rfm score
-    rfm_table['rfm_score'] = (rfm_table.r_score.astype(str) + rfm_table.f_score.astype(str)
-                              + rfm_table.m_score.astype(str))
+    r_bins = np.array([x * freqs[freq] for x in r_range])
+
+    # shared ordered dtype for all three score columns, declaring the
+    # categories up front lets groupbys use the known codes directly
+    score_dtype = pd.CategoricalDtype([1, 2, 3, 4], ordered=True)
+
+    # assign bins directly with np.searchsorted instead of pd.cut/pd.qcut,
+    # the codes feed pd.Categorical.from_codes without an IntervalIndex.
+    # side='left' keeps the bins right-closed like before,
+    # low recency values score highest
+    r_codes = 3 - np.searchsorted(r_bins[1:-1], rfm_table.recency, side='left')
+    rfm_table['r_score'] = pd.Categorical.from_codes(r_codes, dtype=score_dtype)
+
+    # frequency and monetary value use quartile bins (as pd.qcut did)
+    f_bins = np.quantile(rfm_table.frequency, [0, 0.25, 0.5, 0.75, 1])
+    f_codes = np.searchsorted(f_bins[1:-1], rfm_table.frequency, side='left')
+    rfm_table['f_score'] = pd.Categorical.from_codes(f_codes, dtype=score_dtype)
+
+    m_bins = np.quantile(rfm_table.monetary_value, [0, 0.25, 0.5, 0.75, 1])
+    m_codes = np.searchsorted(m_bins[1:-1], rfm_table.monetary_value, side='left')
+    rfm_table['m_score'] = pd.Categorical.from_codes(m_codes, dtype=score_dtype)
+
+    # combined rfm score, integer-encoded (e.g. 443 instead of '443')
+    # avoids three object casts and a string concat per row,
+    # format with .astype(str) at display time if needed
+    rfm_table['rfm_score'] = (rfm_table.r_score.astype('int16') * 100
+                              + rfm_table.f_score.astype('int16') * 10
+                              + rfm_table.m_score.astype('int16'))
 
     # gather bin info for plotting
     bin_info = {'r': r_bins, 'f': f_bins, 'm': m_bins}
@@ -294,29 +310,29 @@ def get_heatmap_labels(rfm_table):
     heatmap_labels : np.Array
         numpy array with identical shape as heatmap_count
     '''
-    # create matrix of member counts
-    heatmap_count = rfm_table.groupby(
-        ['f_score', 'r_score']).m_score.count().unstack()
+    # build the grouping once and run both aggregations in a single pass.
+    # the score columns are categoricals with declared categories, so the
+    # groupby works off the known codes; observed=False keeps the full
+    # 4x4 grid the heatmap expects
+    grouped = rfm_table.groupby(['f_score', 'r_score'], observed=False) \
+        .agg(count=('m_score', 'count'), monetary_value=('monetary_value', 'mean'))
+
+    # create matrix of member counts.
+    # explicit axis orders instead of category-order sorts: frequency
+    # rows run 4..1 top-down and recency columns 1..4 left-right,
+    # matching the published heatmaps (core members top-right)
+    heatmap_count = grouped['count'].unstack() \
+        .reindex(index=[4, 3, 2, 1], columns=[1, 2, 3, 4])
     heatmap_count.replace(0, np.nan, inplace=True)
-    heatmap_count.sort_index(axis=0, ascending=False,
-                             inplace=True)  # sort index
-    heatmap_count.sort_index(axis=1, ascending=False,
-                             inplace=True)  # sort columns
 
     # create matrix avg. monetary value
-    heatmap_mv = rfm_table.groupby(
-        ['f_score', 'r_score']).monetary_value.mean().unstack()
-    heatmap_mv.sort_index(axis=0, ascending=False, inplace=True)  # sort index
-    heatmap_mv.sort_index(axis=1, ascending=False,
-                          inplace=True)  # sort columns
-
-    # flatten and zip so labels can be used in for loop
-    heatmap_labels = zip(heatmap_count.to_numpy().flatten(),
-                         heatmap_mv.to_numpy().flatten())
-    # wrap label values in stringform
-    heatmap_labels = np.asarray(["{0:.0f} Members\n{1:.2f} EUR avg. Spending".format(
-        count, mv) for count, mv in heatmap_labels])
-    # reshape labels to fit heatmap count
-    heatmap_labels = heatmap_labels.reshape(heatmap_count.shape)
+    heatmap_mv = grouped['monetary_value'].unstack() \
+        .reindex(index=[4, 3, 2, 1], columns=[1, 2, 3, 4])
+
+    # wrap label values in stringform with numpy's C-level string ops,
+    # no python .format call per cell and no flatten/reshape roundtrip
+    counts_str = np.char.mod('%.0f Members\n', heatmap_count.to_numpy())
+    mv_str = np.char.mod('%.2f EUR avg. Spending', heatmap_mv.to_numpy())
+    heatmap_labels = np.char.add(counts_str, mv_str)
 
     return heatmap_count, heatmap_labels
@@ -1,5 +1,6 @@
+import orjson
 import pandas as pd
-import numpy as np
+import pyarrow as pa
 from . import utils, features
 
 
@@ -18,15 +19,23 @@ def make_df_orders(path_dataclip):
     df_orders : pd.DataFrame
         processed orders dataframe
     '''
-    # read JSON
-    df_orders = pd.read_json(path_dataclip)
-    # set df_name
-    df_orders.df_name = 'orders'
-    df_orders._metadata += ['df_name']
+    # column names of the raw dump, in positional order
+    col_names = ['order_ID', 'supplier_ID', 'positions_hash', 'delivery_date', 'created_at',
+                 'updated_at', 'open_order', 'scoop_margin', 'supplier_margin']
+
+    # read JSON with orjson, parses the dump once and keeps
+    # 'positions_hash' as plain dicts without per-row pandas overhead.
+    # naming the columns at construction time skips read_json's implicit
+    # dtype/date conversion passes and the separate rename
+    with open(path_dataclip, 'rb') as file:
+        raw = orjson.loads(file.read())
+    df_orders = pd.DataFrame({name: raw[str(pos)] for pos, name in enumerate(col_names)})
+    # release the parsed dump containers before the conversion passes,
+    # keeps peak memory at roughly one copy of the data on large dumps
+    del raw
 
-    # set column names
-    df_orders.columns = ['order_ID', 'supplier_ID', 'positions_hash', 'delivery_date', 'created_at',
-                         'updated_at', 'open_order', 'scoop_margin', 'supplier_margin']
+    # set df_name
+    df_orders.attrs['df_name'] = 'orders'
 
     # set column 'order_ID' as index and drop old index
     df_orders.set_index('order_ID', drop=True, inplace=True)
@@ -34,16 +43,17 @@ def make_df_orders(path_dataclip):
 
     # parse dates to datetime ##
     date_cols = ['delivery_date', 'created_at', 'updated_at']
-    # pd.to_datetime works only on strings/series not on DataFrames
-    # df.stack() produces a pd.Series where all rows are stacked on top of each other,
-    # then apllies pd.to_datetime(), therafter unstack() reverts everything to its original form.
-    df_orders[date_cols] = pd.to_datetime(df_orders[date_cols].stack(), format='%Y-%m-%d').unstack()
+    # convert column by column, the old stack()/unstack() roundtrip materialized
+    # a hierarchical copy of all three columns just to feed pd.to_datetime.
+    # cache=True deduplicates repeated date strings within a column.
+    for col in date_cols:
+        df_orders[col] = pd.to_datetime(df_orders[col], cache=True)
 
     # Create 'members' and 'products' cols from 'position_hash' #
-    # create new column with member values out of df_orders['positions_hash']
-    df_orders['members'] = [df_orders.loc[i, 'positions_hash']['members'] for i in df_orders.index]
-    # create new column with products values out of df_orders['positions_hash']
-    df_orders['products'] = [df_orders.loc[i, 'positions_hash']['products'] for i in df_orders.index]
+    # iterate the column directly, no per-row .loc lookup;
+    # the lists hold references, not copies of the dicts
+    df_orders['members'] = [position['members'] for position in df_orders['positions_hash']]
+    df_orders['products'] = [position['products'] for position in df_orders['positions_hash']]
     # drop df_orders['positions_hash']
     df_orders = df_orders.drop('positions_hash', axis=1)
 
@@ -66,26 +76,39 @@ def make_df_members(df_orders):
     df_members : pd.DataFrame
         dataframe with scoop members
     '''
-    # create empty DataFrame and insert an aditional column for order_ID
-    df_members = pd.DataFrame()
-    df_members.insert(0, 'order_ID', '')
-
-    # loop through df_orders.index (i = Order_ID )
-    for i in df_orders.index:
-        order = pd.DataFrame(df_orders.members[i]).T
-        order['order_ID'] = i
-        df_members = pd.concat([df_members, order])
-
-    # reset index
-    df_members.index.name = 'member_ID'
-    df_members.index = df_members.index.astype('int')
+    # explicit schema for the scalar columns, the pyarrow batch build
+    # below skips the per-column dtype inference of from_records
+    member_schema = pa.schema([('order_ID', pa.int64()),
+                               ('member_ID', pa.int64()),
+                               ('name', pa.string()),
+                               ('collected?', pa.bool_())])
+
+    # collect one row per (order, member) in a plain list;
+    # the dict-valued fields can't live in an arrow table
+    # and are collected separately
+    rows, order_requests, deposits = [], [], []
+    for order_ID, members in zip(df_orders.index, df_orders.members):
+        for member_ID, member in members.items():
+            rows.append({'order_ID': order_ID, 'member_ID': int(member_ID),
+                         'name': member.get('name'),
+                         'collected?': member.get('collected?')})
+            order_requests.append(member.get('order_requests'))
+            deposits.append(member.get('deposits'))
+
+    df_members = pa.Table.from_pylist(rows, schema=member_schema).to_pandas()
+
+    # attach the dict-valued columns as plain object columns
+    df_members['order_requests'] = order_requests
+    if any(deposit is not None for deposit in deposits):
+        df_members['deposits'] = deposits
+
+    df_members.set_index('member_ID', inplace=True)
 
     # set dtypes
     df_members = df_members.astype({'collected?': 'bool'})
 
     # set df_name
-    df_members.df_name = 'members'
-    df_members._metadata += ['df_name']
+    df_members.attrs['df_name'] = 'members'
 
     return df_members
 
@@ -108,34 +131,34 @@ def make_df_products(df_orders):
     '''
     # Create DataFrame of products dict in df_orders #
 
-    # concat all positions of all orders into one dataframe
-    df_products = pd.DataFrame()
-    # insert new column 'Order_ID' at column position '0'
-    df_products.insert(0, 'order_ID', '')
+    # collect one row per (order, product) in a plain list,
+    # then build the DataFrame in a single allocation (no per-order concat)
+    rows = []
+    for order_ID, products in zip(df_orders.index, df_orders.products):
+        for product_ID, product in products.items():
+            rows.append({'order_ID': order_ID, 'product_ID': product_ID, **product})
 
-    for row in df_orders.index:
-        order = pd.DataFrame(df_orders.products[row]).T
-        order['order_ID'] = row
-        df_products = pd.concat([df_products, order])
+    df_products = pd.DataFrame.from_records(rows)
 
     # multi index #
-    df_products.index.name = 'product_ID'  # set index name
-    df_products.set_index('order_ID', append=True, inplace=True)  # append colum order_ID as second index
-    df_products = df_products.reorder_levels(['order_ID', 'product_ID'], axis=0)  # reorder mulitindex
+    df_products.set_index(['order_ID', 'product_ID'], inplace=True)
 
     # dtypes and string processing #
     # column names with float values
-    float_cols = ['tax_rate', 'net_price', 'bundle_size', 'supplier_code', 'amount_ordered', 'bundles_ordered']
-    # string replace
-    df_products[float_cols] = df_products[float_cols].replace(',', '.', regex=True)
-    df_products[float_cols] = df_products[float_cols].replace('', np.nan, regex=True)
-    # change dtypes to float
-    df_products = df_products.astype({'tax_rate': 'float', 'net_price': 'float', 'bundle_size': 'float',
-                                      'amount_ordered': 'float', 'bundles_ordered': 'float'})
+    float_cols = ['tax_rate', 'net_price', 'bundle_size', 'amount_ordered', 'bundles_ordered']
+    # literal string replace and empty-string masking per column,
+    # skips the regex engine the old .replace(..., regex=True) passes went through
+    # (supplier_code gets the same cleanup but stays a string)
+    for col in float_cols + ['supplier_code']:
+        cleaned = df_products[col].astype('string').str.replace(',', '.', regex=False)
+        df_products[col] = cleaned.mask(cleaned == '')
+    # change dtypes to float, pd.to_numeric converts directly in C
+    # (astype keeps the plain float64 dtype of the old code path)
+    for col in float_cols:
+        df_products[col] = pd.to_numeric(df_products[col]).astype('float')
 
     # set df_name
-    df_products.df_name = 'products'
-    df_products._metadata += ['df_name']
+    df_products.attrs['df_name'] = 'products'
 
     return df_products
 
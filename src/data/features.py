@@ -1,5 +1,64 @@
 import pandas as pd
 import numpy as np
+from numba import njit
+
+
+@njit(cache=True)
+def _sum_order_request_values(row_offsets, net_prices, filled_amounts, out):
+    '''
+    Numba kernel: sum net_price * filled_amount per member row.
+    row_offsets[i]:row_offsets[i+1] delimits the requests of member row i,
+    NaN net_prices (products missing in df_products) are skipped.
+    '''
+    for i in range(out.size):
+        total = 0.0
+        for j in range(row_offsets[i], row_offsets[i + 1]):
+            value = net_prices[j] * filled_amounts[j]
+            if not np.isnan(value):
+                total += value
+        out[i] = total
+
+
+def flatten_order_requests(df_members):
+    '''
+    Flatten the 'order_requests' dicts of df_members
+    into flat numpy arrays, one entry per requested product.
+
+    Parameters
+    ----------
+    df_members : pd.DataFrame
+
+    Returns
+    -------
+    order_IDs, member_IDs : np.ndarray of int64
+    product_IDs : np.ndarray of str
+        product_IDs stay strings, some are non-numeric (e.g. 'new_product_1')
+    filled_amounts : np.ndarray of float64
+        decimal commas are normalized, empty strings become 0.0
+    row_offsets : np.ndarray of int64
+        CSR-style offsets, row_offsets[i]:row_offsets[i+1] slices the
+        requests of the i-th df_members row out of the flat arrays
+    '''
+    order_IDs, member_IDs, product_IDs, filled_amounts = [], [], [], []
+    row_offsets = [0]
+
+    # tight python loop, all pandas/numpy work happens on the flat arrays afterwards
+    for order_ID, member_ID, order_requests in zip(df_members.order_ID,
+                                                   df_members.member_ID,
+                                                   df_members.order_requests):
+        for product_ID, request in order_requests.items():
+            filled = request.get('filled')
+            order_IDs.append(order_ID)
+            member_IDs.append(member_ID)
+            product_IDs.append(product_ID)
+            filled_amounts.append(float(filled.replace(',', '.')) if filled else 0.0)
+        row_offsets.append(len(order_IDs))
+
+    return (np.asarray(order_IDs, dtype='int64'),
+            np.asarray(member_IDs, dtype='int64'),
+            np.asarray(product_IDs),
+            np.asarray(filled_amounts, dtype='float64'),
+            np.asarray(row_offsets, dtype='int64'))
 
 
 def order_request_value(df_members, df_products):
@@ -17,26 +76,25 @@ def order_request_value(df_members, df_products):
     df_members : pd.DataFrame
         members dataframe with added order_request_value column
     '''
-    # add new column with nan values
-    df_members['order_request_value'] = np.nan
-
-    # loop through df_members to get 'order_ID' and 'order_requests'
-    for i in df_members.index:
-        order_ID = df_members.order_ID[i]
-        order_request = df_members.order_requests[i]  # iPython needs eval() to recognize dict
-
-        # get 'product_ID' and 'filled_amount' from order_request
-        order_request_df = pd.DataFrame(order_request, index=['filled', 'ordered']).T.reset_index()
-        product_ID = order_request_df['index']
-        filled_amount = order_request_df['filled'].replace(',', '.', regex=True)
-        filled_amount = filled_amount.replace(r'^\s*$', 0, regex=True).astype('float')
-
-        # access net_price from df_products and calculate order_request_value
-        net_price = df_products.loc[(order_ID, product_ID), 'net_price'].reset_index(drop=True)
-        order_request_value = np.sum(net_price * filled_amount).round(2)
-
-        # assign order_request_value to df_members
-        df_members.loc[i, 'order_request_value'] = order_request_value
+    # flatten 'order_requests' into flat numpy arrays
+    order_IDs, member_IDs, product_IDs, filled_amounts, row_offsets = \
+        flatten_order_requests(df_members)
+
+    # cache net_price as a plain dict built once, the keys are already
+    # (order_ID, product_ID) tuples; avoids building a MultiIndex over
+    # all request rows just for the lookup
+    net_price_map = df_products['net_price'].to_dict()
+    net_prices = np.array([net_price_map.get((order_ID, product_ID), np.nan)
+                           for order_ID, product_ID in zip(order_IDs, product_IDs)],
+                          dtype='float64')  # NaN for products missing in df_products
+
+    # sum net_price * filled_amount per member row in a numba kernel
+    order_request_values = np.empty(len(df_members), dtype='float64')
+    _sum_order_request_values(row_offsets, net_prices, filled_amounts,
+                              order_request_values)
+
+    # assign to df_members, the kernel output is already in row order
+    df_members['order_request_value'] = order_request_values.round(2)
 
     return df_members
 
@@ -46,7 +104,7 @@ def main(df_orders, df_members, df_products):
     This function adds following features to the dataframes:
     - df_orders: 'total_order_value', 'num_participating_members'
     - df_products: 'net_total_price'
-    - df_members: 'order_request_value', 'delivery_date'
+    - df_members: 'order_request_value', 'delivery_date', 'is_real_member'
 
     Parameters
     ----------
@@ -67,18 +125,29 @@ def main(df_orders, df_members, df_products):
                                   how='left',
                                   on='order_ID')
 
-    # reassign df_name to df_members after merge
-    df_members.df_name = 'members'
-    df_members._metadata += ['df_name']
+    # reassign df_name to df_members, merge does not propagate attrs
+    df_members.attrs['df_name'] = 'members'
 
     # calculate total_order_value and add to df_orders
-    total_order_value = df_products.groupby('order_ID')['net_total_price'].sum()
-    df_orders['total_order_value'] = total_order_value.round(2)
+    # factorize + bincount sums per order in one C pass without groupby machinery
+    # (nan_to_num keeps groupby.sum's skipna behaviour for NaN prices)
+    codes, uniques = pd.factorize(df_products.index.get_level_values('order_ID'),
+                                  sort=False)
+    total_order_value = np.bincount(codes,
+                                    weights=np.nan_to_num(df_products['net_total_price']))
+    df_orders['total_order_value'] = pd.Series(total_order_value, index=uniques) \
+        .reindex(df_orders.index).round(2)
 
     # get num_participating_members and add to df_orders
-    df_orders['num_participating_members'] = df_members.groupby('order_ID').size()
+    codes, uniques = pd.factorize(df_members['order_ID'], sort=False)
+    df_orders['num_participating_members'] = pd.Series(np.bincount(codes), index=uniques) \
+        .reindex(df_orders.index)
 
     # get order_request_value and add to members dataframe
     df_members = order_request_value(df_members, df_products)
 
+    # cache the company-account mask once, the analysis entry points
+    # reuse it instead of recomparing member_ID per call
+    df_members['is_real_member'] = df_members.member_ID != 46
+
     return df_orders, df_members, df_products
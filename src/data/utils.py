@@ -1,32 +1,239 @@
+import ctypes
+import gc
+import io
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from functools import lru_cache
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.dataset as pads
 
+# export paths resolved once at import time; _SCRIPT_DIR is already
+# absolute, so normpath collapses the '..' segments with pure string
+# work instead of abspath's getcwd round trip
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+_CSV_EXPORT_PATH = os.path.normpath(
+    os.path.join(_SCRIPT_DIR, '../../data/processed/')) + os.sep
+_FIG_EXPORT_PATH = os.path.normpath(os.path.join(_SCRIPT_DIR, '../../figures/'))
 
-def export_as_csv(df_list):
+
+@lru_cache(maxsize=1)
+def _todaystr(today):
+    '''Format today's date once per day per process, keyed on the date.'''
+    return today.strftime('%Y%m%d')
+
+
+# frames below this row count go through a single to_csv call,
+# the sharded path only pays off once formatting dominates
+_PARALLEL_CSV_MIN_ROWS = 100_000
+
+# default dtype maps for the csv reads in load_data, narrow where the
+# values allow it without loss (IDs/counters fit int32, flags are bool);
+# float columns stay float64 so loaded values match the exported ones
+_ORDERS_DTYPES = {'supplier_ID': 'int32',
+                  'open_order': 'bool'}
+_MEMBERS_DTYPES = {'order_ID': 'int32',
+                   'member_ID': 'int32',
+                   'collected?': 'bool',
+                   'is_real_member': 'bool'}
+_PRODUCTS_DTYPES = {}
+
+
+def _apply_dtypes(df, dtype_map):
+    '''Narrow df to the dtypes in dtype_map, ignoring absent columns.'''
+    # the pyarrow csv engine applies user dtypes via astype after the
+    # parse anyway, doing it here avoids its crash on all-null columns
+    return df.astype({col: dtype for col, dtype in dtype_map.items()
+                      if col in df.columns})
+
+
+# glibc handle for malloc_trim, None where unavailable (non-Linux)
+try:
+    _LIBC = ctypes.CDLL('libc.so.6')
+except OSError:
+    _LIBC = None
+
+
+def _release_memory():
+    '''
+    Collect garbage and return freed allocator arenas to the OS.
+
+    The csv parsers allocate large temporary object arrays for string
+    columns that otherwise linger in glibc's freelists between loads.
+    '''
+    gc.collect()
+    if _LIBC is not None:
+        _LIBC.malloc_trim(0)
+
+
+# the exporters write '{date}_scoop_{kind}.{csv,csv.zst,parquet}',
+# one compiled match per filename replaces the per-kind substring scans
+_FILE_KIND_RE = re.compile(
+    r'_scoop_(orders|members|products)\.(?:csv(?:\.zst)?|parquet)$')
+
+
+def _read_csv_chunked(path, chunksize, dtype_map, **kwargs):
+    '''
+    Stream a csv in chunks of chunksize rows, narrowing each chunk
+    before concatenating, so peak memory stays near chunk + result
+    instead of two full-width copies.
+
+    Uses the C engine, the pyarrow engine does not support chunksize.
+    '''
+    chunks = [_apply_dtypes(chunk, dtype_map)
+              for chunk in pd.read_csv(path, chunksize=chunksize, **kwargs)]
+    df = pd.concat(chunks)
+    # drop the chunk frames before returning, the concat kept
+    # the only copies that matter
+    del chunks
+    _release_memory()
+    return df
+
+
+def _parallel_to_csv(df, filepath, n_threads=4):
+    '''
+    Format df to csv in row shards on a thread pool and write the
+    shards in order through one large buffered file handle.
+
+    to_csv releases the GIL in its C formatter, so the shards format
+    on multiple cores; only the first shard carries the header.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+    filepath : str
+    n_threads : int, optional
+    '''
+    bounds = [round(i * len(df) / n_threads) for i in range(n_threads + 1)]
+
+    def format_shard(i):
+        return df.iloc[bounds[i]:bounds[i + 1]].to_csv(header=(i == 0))
+
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        shards = executor.map(format_shard, range(n_threads))
+        with open(filepath, 'w', buffering=4 * 1024 * 1024) as file:
+            for shard in shards:
+                file.write(shard)
+
+
+def export_as_csv(df_list, compression='zstd'):
     '''
     takes in a list of dataframes and an output directory path
     and exports the dataframes as csv-files to the chosen output directory.
 
+    Parameters
+    ----------
+    df_list : List of pd.DataFrames
+    compression : {'zstd', None}, optional
+        compress the csv output ('.csv.zst'), by default 'zstd';
+        shrinks the files several-fold and cuts reload I/O, load_data
+        decompresses transparently. Pass None for plain '.csv'.
+    '''
+    if not df_list:
+        return
+
+    abs_export_path = _CSV_EXPORT_PATH
+    # timestamp of today as string
+    todaystr = _todaystr(date.today())
+    extension = '.csv.zst' if compression == 'zstd' else '.csv'
+
+    # build all (df, filename) pairs up front; a dataframe without a
+    # df_name attr fails fast here instead of inside a worker thread,
+    # and the workers stay pure writes
+    jobs = [(df, f'{todaystr}_scoop_{df.attrs["df_name"]}{extension}')
+            for df in df_list]
+
+    def write_one(job):
+        df, filename = job
+        filepath = abs_export_path + filename
+
+        # export to .csv through arrow's threaded C++ writer;
+        # bool columns are written as 'True'/'False' strings so the files
+        # keep pandas' spelling and read back as bool columns
+        try:
+            # reset the index into leading columns for to_csv parity,
+            # from_pandas(preserve_index=True) appends it as the last
+            # column, which breaks the loaders' positional index_col
+            flat = df.reset_index()
+            if df.index.name is None and df.index.nlevels == 1:
+                # to_csv writes an unnamed index with an empty header
+                flat = flat.rename(columns={'index': ''})
+            bool_cols = flat.dtypes[flat.dtypes == bool].index
+            table = pa.Table.from_pandas(flat.astype({col: 'str' for col in bool_cols}),
+                                         preserve_index=False)
+            write_options = pacsv.WriteOptions(batch_size=65536)
+            if compression:
+                # arrow ships its own zstd codec, the compressor runs
+                # in C while the thread pool overlaps the other frames
+                with pa.CompressedOutputStream(filepath, 'zstd') as stream:
+                    pacsv.write_csv(table, stream, write_options=write_options)
+            else:
+                pacsv.write_csv(table, filepath, write_options=write_options)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            # frames with dict-valued object columns (e.g. order_requests)
+            # can't convert to arrow, keep the pandas writer for those.
+            # large frames format in parallel row shards, the rest go
+            # through one to_csv call.
+            if compression:
+                df.to_csv(filepath, compression={'method': 'zstd', 'level': 3},
+                          chunksize=200_000)
+            elif len(df) >= _PARALLEL_CSV_MIN_ROWS:
+                _parallel_to_csv(df, filepath)
+            else:
+                # open the file ourselves with a 4 MiB buffer, to_csv's default
+                # ~8 KiB buffer flushes every small formatted chunk as its own
+                # write syscall; binary mode lets pandas encode directly in C
+                with open(filepath, 'wb', buffering=4 * 1024 * 1024) as file:
+                    df.to_csv(file, chunksize=200_000)
+
+        print(f'{filename} exported to {abs_export_path}')
+
+    # write the dataframes in parallel, to_csv releases the GIL
+    # in its C writer so the disk writes and formatting overlap
+    with ThreadPoolExecutor(max_workers=min(8, len(jobs))) as executor:
+        list(executor.map(write_one, jobs))
+
+
+def export_as_parquet(df_list):
+    '''
+    takes in a list of dataframes and exports them as parquet files
+    to ./data/processed. Parquet stores dtypes and timestamps natively,
+    so loading skips the csv date parsing entirely.
+
     Parameters
     ----------
     df_list : List of pd.DataFrames
     '''
-    # set abs export path
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    RELATIV_EXPORT_PATH = '../../data/processed/'
-    abs_export_path = os.path.join(script_dir, RELATIV_EXPORT_PATH)
+    if not df_list:
+        return
+
+    abs_export_path = _CSV_EXPORT_PATH
     # timestamp of today as string
-    todaystr = pd.to_datetime("today").strftime("%Y%m%d")
-
-    for df in df_list:
-        # get df_name
-        df_name = df.df_name
-        # create filename string
-        filename = f'{todaystr}_scoop_{df_name}.csv'
-        # export to .csv
-        df.to_csv(abs_export_path + filename)
+    todaystr = _todaystr(date.today())
+
+    # precompute the filename stems, validating df_name before the pool
+    jobs = [(df, f'{todaystr}_scoop_{df.attrs["df_name"]}')
+            for df in df_list]
+
+    def write_one(job):
+        df, stem = job
+        filename = f'{stem}.parquet'
+        try:
+            df.to_parquet(abs_export_path + filename, engine='pyarrow',
+                          compression='zstd', compression_level=3)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            # frames with dict-valued object columns (e.g. order_requests)
+            # can't convert to arrow, export those as csv instead
+            filename = f'{stem}.csv'
+            df.to_csv(abs_export_path + filename)
         print(f'{filename} exported to {abs_export_path}')
 
+    with ThreadPoolExecutor(max_workers=min(8, len(jobs))) as executor:
+        list(executor.map(write_one, jobs))
+
 
 def export_plot(fig, figname, freq):
     '''
@@ -41,7 +248,7 @@ def export_plot(fig, figname, freq):
 
     '''
     # filename
-    todaystr = pd.to_datetime("today").strftime("%Y%m%d")
+    todaystr = _todaystr(date.today())
     if freq:
         filestr = f'_{freq}_{figname}.png'
     else:
@@ -49,25 +256,111 @@ def export_plot(fig, figname, freq):
     filename = todaystr + filestr
 
     # export path
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    RELATIV_EXPORT_PATH = '../../figures/'
-    abs_export_path = os.path.abspath(
-        os.path.join(script_dir, RELATIV_EXPORT_PATH))
-
-    # save file
-    fig.savefig(abs_export_path + '/' + filename,
-                dpi=300, bbox_inches='tight')
+    abs_export_path = _FIG_EXPORT_PATH
+
+    # save file: render the png into memory first, savefig(path) writes
+    # many small blocks while rasterizing; one os.write flushes the
+    # whole image in a single syscall
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
+    fd = os.open(os.path.join(abs_export_path, filename),
+                 os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, buffer.getbuffer())
+    finally:
+        os.close(fd)
     print(f'{filename} exported to {abs_export_path}')
 
 
-def load_data(folder_path='data/processed'):
+def _load_orders(path, requested, dtype_map, chunksize):
+    '''Read an orders file, csv reads parse the three date columns.'''
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path, engine='pyarrow', columns=requested)
+    parse_dates = ['delivery_date', 'created_at', 'updated_at']
+    if requested is not None:
+        parse_dates = [col for col in parse_dates if col in requested]
+        # the index column is always needed, union it into the request
+        if 'order_ID' not in requested:
+            requested = ['order_ID', *requested]
+    kwargs = dict(index_col='order_ID',
+                  usecols=requested,
+                  parse_dates=parse_dates)
+    if chunksize:
+        # date_format keeps the C engine off dateutil's python parser;
+        # ISO8601 covers both the date and timestamp columns
+        return _read_csv_chunked(path, chunksize, dtype_map,
+                                 date_format='ISO8601', **kwargs)
+    return _apply_dtypes(pd.read_csv(path, engine='pyarrow', **kwargs),
+                         dtype_map)
+
+
+def _load_members(path, requested, dtype_map, chunksize):
+    '''Read a members file, csv reads parse delivery_date.'''
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path, engine='pyarrow', columns=requested)
+    parse_dates = (['delivery_date'] if requested is None
+                   or 'delivery_date' in requested else [])
+    # the stored index is only the old row number (written under an
+    # empty header); column-subset reads skip it and keep a fresh
+    # RangeIndex instead of applying positional index_col to the
+    # filtered column set
+    kwargs = dict(index_col=[0] if requested is None else None,
+                  usecols=requested,
+                  parse_dates=parse_dates)
+    if chunksize:
+        return _read_csv_chunked(path, chunksize, dtype_map,
+                                 date_format='ISO8601', **kwargs)
+    return _apply_dtypes(pd.read_csv(path, engine='pyarrow', **kwargs),
+                         dtype_map)
+
+
+def _load_products(path, requested, dtype_map, chunksize):
+    '''Read a products file, indexed by (order_ID, product_ID).'''
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path, engine='pyarrow', columns=requested)
+    if requested is not None:
+        # the index columns are always needed, union them into the request
+        requested = [*[col for col in ('order_ID', 'product_ID')
+                       if col not in requested], *requested]
+    kwargs = dict(index_col=['order_ID', 'product_ID'],
+                  usecols=requested)
+    if chunksize:
+        return _read_csv_chunked(path, chunksize, dtype_map, **kwargs)
+    return _apply_dtypes(pd.read_csv(path, engine='pyarrow', **kwargs),
+                         dtype_map)
+
+
+# dispatch table for load_data, the loaders freeze each kind's
+# index/date kwargs
+_LOADERS = {'orders': _load_orders,
+            'members': _load_members,
+            'products': _load_products}
+
+
+def load_data(folder_path='data/processed', columns=None, dtypes=None,
+              chunksize=None):
     '''
-    Load csv files and return the respective dataframes.
+    Load parquet/csv files and return the respective dataframes.
 
     Parameters
     ----------
     folder_path : str, optional
-        relativ directory path to csv files, by default 'data/processed'
+        relativ directory path to data files, by default 'data/processed'
+    columns : dict of {str: list of str}, optional
+        columns to load per dataframe, keyed by 'orders'/'members'/'products';
+        restricting the read skips parsing (and memory) for unused columns.
+        Index columns (order_ID, product_ID) are loaded automatically and
+        need not be listed; a restricted members read keeps a fresh
+        RangeIndex since its stored index is just the old row number
+    dtypes : dict of {str: dict}, optional
+        dtype maps per dataframe, same keys as columns; defaults to the
+        module-level _*_DTYPES maps which narrow IDs and flags losslessly
+        (csv reads only, parquet files already store their dtypes)
+    chunksize : int, optional
+        stream csv files in chunks of this many rows and narrow each
+        chunk before concatenating; bounds peak memory on dumps near the
+        RAM ceiling at a ~10% parse-time cost (uses the single-threaded
+        C engine, the pyarrow engine cannot stream)
 
     Returns
     -------
@@ -78,29 +371,126 @@ def load_data(folder_path='data/processed'):
     -----
     df_orders, df_members, df_products = src.load_data('data/processed')
     '''
-    # return None if csv does not exist
+    # return None if no file exists
     df_orders = df_members = df_products = None
 
-    # list all files in folder_path
-    listdir = os.listdir(folder_path)
-    print(listdir)
-
-    # read csv and create dataframes
-    for csv in listdir:
-        if 'orders' in csv:
-            df_orders = pd.read_csv(folder_path + '/' + csv,
-                                    index_col='order_ID',
-                                    parse_dates=['delivery_date', 'created_at',
-                                                 'updated_at'])
-        elif 'members' in csv:
-            df_members = pd.read_csv(folder_path + '/' + csv,
-                                     index_col=[0],
-                                     parse_dates=['delivery_date'])
-            # reminder: scoop company account
-            print('reminder: data from scoop company account (#46) is included')
-
-        elif 'products' in csv:
-            df_products = pd.read_csv(folder_path + '/' + csv,
-                                      index_col=['order_ID', 'product_ID'])
+    columns = columns or {}
+    default_dtypes = {'orders': _ORDERS_DTYPES,
+                      'members': _MEMBERS_DTYPES,
+                      'products': _PRODUCTS_DTYPES}
+    dtypes = {**default_dtypes, **(dtypes or {})}
+
+    # scan folder_path lazily, DirEntry carries cached type info
+    # so no extra stat call per file is needed.
+    # one regex match per filename decides the kind, parquet exports are
+    # preferred over csv ones: they store dtypes and timestamps natively
+    paths = {}
+    with os.scandir(folder_path) as entries:
+        for entry in entries:
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            match = _FILE_KIND_RE.search(entry.name)
+            if match is None:
+                continue
+            kind = match.group(1)
+            if kind not in paths or entry.name.endswith('.parquet'):
+                paths[kind] = entry.path
+
+    # read files through the per-kind loaders, releasing the parser's
+    # temporary buffers before the next file is parsed
+    frames = {}
+    for kind, path in paths.items():
+        frames[kind] = _LOADERS[kind](path, columns.get(kind), dtypes[kind],
+                                      chunksize)
+        _release_memory()
+    df_orders = frames.get('orders')
+    df_members = frames.get('members')
+    df_products = frames.get('products')
+
+    if df_members is not None:
+        # reminder: scoop company account
+        print('reminder: data from scoop company account (#46) is included')
 
     return df_orders, df_members, df_products
+
+
+# index columns per kind, applied after a dataset scan (the arrow
+# dataset reader returns plain columns, unlike the per-file loaders);
+# members csvs carry their old index as an unnamed first column
+_DS_INDEX_COLS = {'orders': 'order_ID',
+                  'members': '',
+                  'products': ['order_ID', 'product_ID']}
+
+
+def load_data_ds(folder_path='data/processed'):
+    '''
+    Load all export shards per dataframe kind in one parallel arrow
+    dataset scan and concatenate them.
+
+    Unlike load_data, which picks a single file per kind, this reads
+    every matching shard (e.g. accumulated weekly exports) in one
+    multi-threaded pass; to_pandas(self_destruct=True) releases the
+    arrow buffers column by column while the frames are built.
+
+    Parameters
+    ----------
+    folder_path : str, optional
+        relativ directory path to data files, by default 'data/processed'
+
+    Returns
+    -------
+    df_orders, df_members, df_products : pd.DataFrame
+        Returns respective dataframes, None if not found
+    '''
+    # group shard paths by kind and format, parquet shards win over csv
+    shards = {}
+    with os.scandir(folder_path) as entries:
+        for entry in entries:
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            match = _FILE_KIND_RE.search(entry.name)
+            if match is None:
+                continue
+            fmt = 'parquet' if entry.name.endswith('.parquet') else 'csv'
+            shards.setdefault((match.group(1), fmt), []).append(entry.path)
+
+    default_dtypes = {'orders': _ORDERS_DTYPES,
+                      'members': _MEMBERS_DTYPES,
+                      'products': _PRODUCTS_DTYPES}
+
+    frames = {}
+    for kind in ('orders', 'members', 'products'):
+        for fmt in ('parquet', 'csv'):
+            files = shards.get((kind, fmt))
+            if not files:
+                continue
+            if fmt == 'csv' and any(f.endswith('.zst') for f in files):
+                # the dataset csv format cannot decompress shards,
+                # pyarrow.csv detects the codec from the extension
+                table = pa.concat_tables([pacsv.read_csv(f)
+                                          for f in sorted(files)],
+                                         promote_options='permissive')
+            else:
+                table = pads.dataset(sorted(files), format=fmt) \
+                    .to_table(use_threads=True)
+            # date_as_object=False converts arrow date32 columns (the
+            # csv scan infers plain dates like delivery_date as dates,
+            # not timestamps) to datetime64 instead of datetime.date
+            # objects, keeping dtype parity with load_data
+            df = table.to_pandas(self_destruct=True, date_as_object=False)
+            index_cols = _DS_INDEX_COLS[kind]
+            wanted = [index_cols] if isinstance(index_cols, str) else index_cols
+            if df.index.names == [None] and all(col in df.columns
+                                                for col in wanted):
+                df.set_index(index_cols, inplace=True)
+                if index_cols == '':
+                    df.index.name = None
+            frames[kind] = _apply_dtypes(df, default_dtypes[kind])
+            _release_memory()
+            break
+
+    if 'members' in frames:
+        # reminder: scoop company account
+        print('reminder: data from scoop company account (#46) is included')
+
+    return frames.get('orders'), frames.get('members'), frames.get('products')